@@ -4,61 +4,404 @@ Args: event с httpMethod, body, queryStringParameters
 Returns: HTTP response с данными
 '''
 
+import time
+
+_import_started = time.perf_counter()
+
+import base64
+import hashlib
+import hmac
 import json
 import os
-from datetime import datetime, timedelta
+import re
+import secrets
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Expose-Headers': 'X-Wal-Lsn'
+}
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
+    'Access-Control-Max-Age': '86400'
+}
+
+PREFLIGHT_RESPONSE = {
+    'statusCode': 200,
+    'headers': CORS_HEADERS,
+    'body': '',
+    'isBase64Encoded': False
+}
+
+NOT_FOUND_RESPONSE = {
+    'statusCode': 404,
+    'headers': JSON_HEADERS,
+    'body': json.dumps({'error': 'Not found'}),
+    'isBase64Encoded': False
+}
+
+SUCCESS_RESPONSE = {
+    'statusCode': 200,
+    'headers': JSON_HEADERS,
+    'body': json.dumps({'success': True}),
+    'isBase64Encoded': False
+}
+
+SESSION_TTL_SECONDS = 7 * 24 * 3600
+
+# Аккаунт модератора может удалять чужие объявления и сообщения и читать чужие данные
+MODERATOR_USERNAME = 'RoTradeAc'
+
+# Реплики для чтения: DATABASE_READ_URL может содержать несколько DSN через запятую
+READ_URLS = [url.strip() for url in os.environ.get('DATABASE_READ_URL', '').split(',') if url.strip()]
+# Сколько ждать, пока реплика догонит LSN клиента, прежде чем читать с primary
+REPLICA_WAIT_SECONDS = 0.2
+REPLICA_POLL_SECONDS = 0.02
+# connect_timeout ниже 2 секунд libpq всё равно округляет до 2, поэтому недоступная
+# реплика помечается упавшей и не опрашивается REPLICA_RETRY_SECONDS
+READ_CONNECT_TIMEOUT_SECONDS = 2
+REPLICA_RETRY_SECONDS = 30
+WAL_LSN_PATTERN = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+
+# Действия, в которых клиент передаёт id пользователя, от имени которого действует
+ACTOR_FIELDS = {
+    'listing': 'userId',
+    'message': 'fromUserId',
+    'report': 'reporterId',
+    'review': 'fromUserId',
+    'deposit': 'userId',
+    'feature-listing': 'userId',
+}
+
+# GET-действия с личными данными: только для владельца userId (или модератора)
+PRIVATE_READS = {'messages', 'user-coins', 'deposits'}
+
+LISTINGS_QUERY = '''
+    SELECT l.id, l.user_id, u.username, l.title, l.description, 
+           l.image_url, l.game_url, l.game_name, l.created_at,
+           l.is_featured, l.featured_until
+    FROM listings l
+    JOIN users u ON l.user_id = u.id
+    WHERE l.is_active = true
+    ORDER BY l.is_featured DESC, l.created_at DESC
+'''
+
+MESSAGES_QUERY = '''
+    SELECT m.id, m.from_user_id, m.to_user_id, m.content, m.reply_to_id, m.created_at
+    FROM messages m
+    ORDER BY m.created_at ASC
+'''
+
+USER_MESSAGES_QUERY = '''
+    SELECT m.id, m.from_user_id, m.to_user_id, m.content, m.reply_to_id, m.created_at
+    FROM messages m
+    WHERE m.from_user_id = %s OR m.to_user_id = %s
+    ORDER BY m.created_at ASC
+'''
+
+USERS_QUERY = '''
+    SELECT id, username, avatar_url, created_at, reports_count
+    FROM users
+    WHERE is_removed = false
+'''
+
+USER_COINS_QUERY = 'SELECT coins FROM users WHERE id = %s'
+
+DEPOSITS_QUERY = '''
+    SELECT id, user_id, amount_rub, coins_received, status, created_at
+    FROM deposits
+    ORDER BY created_at DESC
+'''
+
+USER_DEPOSITS_QUERY = '''
+    SELECT id, user_id, amount_rub, coins_received, status, created_at
+    FROM deposits
+    WHERE user_id = %s
+    ORDER BY created_at DESC
+'''
+
+REPORTS_QUERY = '''
+    SELECT r.id, r.reporter_id, r.reported_user_id, r.reason, r.created_at,
+           u1.username as reporter_username, u2.username as reported_username
+    FROM reports r
+    JOIN users u1 ON r.reporter_id = u1.id
+    JOIN users u2 ON r.reported_user_id = u2.id
+    ORDER BY r.created_at DESC
+'''
+
+REVIEWS_QUERY = '''
+    SELECT r.id, r.from_user_id, r.to_user_id, r.rating, r.comment, r.created_at,
+           u.username as from_username
+    FROM reviews r
+    JOIN users u ON r.from_user_id = u.id
+    ORDER BY r.created_at DESC
+'''
+
+USER_REVIEWS_QUERY = '''
+    SELECT r.id, r.from_user_id, r.to_user_id, r.rating, r.comment, r.created_at,
+           u.username as from_username
+    FROM reviews r
+    JOIN users u ON r.from_user_id = u.id
+    WHERE r.to_user_id = %s
+    ORDER BY r.created_at DESC
+'''
+
+# Запросы, которые фронтенд опрашивает постоянно; их планы проверяет tools/check_query_plans.py.
+# Все параметры %s в них - id пользователя.
+HOT_QUERIES = {
+    'listings': LISTINGS_QUERY,
+    'messages': MESSAGES_QUERY,
+    'user-messages': USER_MESSAGES_QUERY,
+    'users': USERS_QUERY,
+    'user-coins': USER_COINS_QUERY,
+    'deposits': DEPOSITS_QUERY,
+    'user-deposits': USER_DEPOSITS_QUERY,
+    'reports': REPORTS_QUERY,
+    'reviews': REVIEWS_QUERY,
+    'user-reviews': USER_REVIEWS_QUERY,
+}
+
+# Отозванные токены: jti -> время истечения токена (unix time)
+_revoked_tokens: Dict[str, float] = {}
+
+# Счётчик для перебора реплик по кругу
+_replica_offset = 0
+
+# DSN реплики -> время (time.monotonic), до которого она считается недоступной
+_replica_down_until: Dict[str, float] = {}
+
+# Время импорта модуля и первого запроса; печатается в лог один раз на инстанс
+startup_profile: Dict[str, Any] = {'import_ms': None, 'first_request_ms': None}
+
 def get_db_connection():
     return psycopg2.connect(os.environ['DATABASE_URL'])
 
+# Отставание реплики от min_lsn в байтах WAL; 0 - реплика догнала (или это primary).
+# Реплика, которая ещё ничего не применила (pg_last_wal_replay_lsn() IS NULL), считается отстающей
+def replica_lag_bytes(conn, min_lsn: str) -> float:
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT CASE WHEN pg_is_in_recovery()
+                    THEN GREATEST(COALESCE(pg_wal_lsn_diff(%s::pg_lsn, pg_last_wal_replay_lsn()), 1), 0)
+                    ELSE 0 END
+    ''', (min_lsn,))
+    lag = cur.fetchone()[0]
+    cur.close()
+    return float(lag)
+
+def mark_replica_down(dsn: str) -> None:
+    _replica_down_until[dsn] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+# Соединение для GET-запросов: реплика, которая уже применила min_lsn клиента, иначе primary.
+# Каждая доступная реплика проверяется один раз; если ни одна не догнала, ждём только
+# наименее отстающую. Недоступные реплики пропускаются до истечения _replica_down_until
+def get_read_connection(min_lsn: Optional[str] = None):
+    global _replica_offset
+    if not READ_URLS:
+        return get_db_connection()
+    
+    first = _replica_offset
+    _replica_offset = (_replica_offset + 1) % len(READ_URLS)
+    now = time.monotonic()
+    best = None
+    
+    for i in range(len(READ_URLS)):
+        dsn = READ_URLS[(first + i) % len(READ_URLS)]
+        if _replica_down_until.get(dsn, 0) > now:
+            continue
+        try:
+            conn = psycopg2.connect(dsn, connect_timeout=READ_CONNECT_TIMEOUT_SECONDS)
+            if not min_lsn:
+                return conn
+            lag = replica_lag_bytes(conn, min_lsn)
+        except psycopg2.Error:
+            mark_replica_down(dsn)
+            continue
+        
+        if lag == 0:
+            if best:
+                best[2].close()
+            return conn
+        if best is None or lag < best[0]:
+            if best:
+                best[2].close()
+            best = (lag, dsn, conn)
+        else:
+            conn.close()
+    
+    if best:
+        _, dsn, conn = best
+        deadline = time.monotonic() + REPLICA_WAIT_SECONDS
+        try:
+            while time.monotonic() < deadline:
+                time.sleep(REPLICA_POLL_SECONDS)
+                if replica_lag_bytes(conn, min_lsn) == 0:
+                    return conn
+        except psycopg2.Error:
+            mark_replica_down(dsn)
+        conn.close()
+    
+    return get_db_connection()
+
+# Коммитит запись и, если есть реплики, возвращает LSN, чтобы клиент прочитал свои записи
+def commit_write(conn) -> Optional[str]:
+    conn.commit()
+    if not READ_URLS:
+        return None
+    cur = conn.cursor()
+    cur.execute('SELECT pg_current_wal_lsn()::text')
+    wal_lsn = cur.fetchone()[0]
+    cur.close()
+    return wal_lsn
+
+# Готовые ответы отдаются копиями: платформа или другой код не должны менять шаблоны
+def copy_response(template: Dict[str, Any]) -> Dict[str, Any]:
+    return {**template, 'headers': dict(template['headers'])}
+
+def json_response(status_code: int, payload: Any, wal_lsn: Optional[str] = None) -> Dict[str, Any]:
+    headers = dict(JSON_HEADERS)
+    if wal_lsn:
+        headers['X-Wal-Lsn'] = wal_lsn
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': json.dumps(payload),
+        'isBase64Encoded': False
+    }
+
+def get_session_secret() -> bytes:
+    secret = os.environ.get('SESSION_SECRET')
+    if secret:
+        return secret.encode()
+    # Без отдельного секрета ключ выводится из DATABASE_URL (он содержит пароль БД)
+    return hashlib.sha256(('rotrade-session:' + os.environ['DATABASE_URL']).encode()).digest()
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def issue_session_token(user_id: int, is_moderator: bool = False) -> Dict[str, Any]:
+    expires_at = int(time.time()) + SESSION_TTL_SECONDS
+    payload = {'uid': user_id, 'mod': is_moderator, 'exp': expires_at, 'jti': secrets.token_urlsafe(12)}
+    encoded = _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    signature = hmac.new(get_session_secret(), encoded.encode(), hashlib.sha256).digest()
+    return {
+        'token': f'{encoded}.{_b64encode(signature)}',
+        'expires_at': datetime.fromtimestamp(expires_at, timezone.utc).isoformat()
+    }
+
+def verify_session_token(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not token or token.count('.') != 1:
+        return None
+    encoded, signature = token.split('.')
+    expected = hmac.new(get_session_secret(), encoded.encode(), hashlib.sha256).digest()
+    try:
+        if not hmac.compare_digest(_b64decode(signature), expected):
+            return None
+        payload = json.loads(_b64decode(encoded))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get('exp', 0) < time.time() or payload.get('jti') in _revoked_tokens:
+        return None
+    return payload
+
+def revoke_session_token(session: Dict[str, Any]) -> None:
+    now = time.time()
+    for jti, expires_at in list(_revoked_tokens.items()):
+        if expires_at < now:
+            del _revoked_tokens[jti]
+    _revoked_tokens[session['jti']] = session['exp']
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    if startup_profile['first_request_ms'] is not None:
+        return route(event)
+    
+    started = time.perf_counter()
+    response = route(event)
+    startup_profile['first_request_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    print(json.dumps({
+        'event': 'cold_start',
+        'action': (event.get('queryStringParameters') or {}).get('action', ''),
+        **startup_profile
+    }))
+    return response
+
+def route(event: Dict[str, Any]) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     path: str = event.get('queryStringParameters', {}).get('action', '')
     
     if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+        return copy_response(PREFLIGHT_RESPONSE)
+    
+    session = verify_session_token(get_header(event, 'X-Auth-Token'))
     
     try:
         if method == 'GET':
+            min_lsn = event.get('queryStringParameters', {}).get('minLsn')
+            if min_lsn and not WAL_LSN_PATTERN.match(min_lsn):
+                min_lsn = None
+            
+            if path in PRIVATE_READS:
+                if not session:
+                    return json_response(401, {'error': 'Unauthorized'})
+                user_id = event.get('queryStringParameters', {}).get('userId')
+                if user_id and user_id != str(session['uid']) and not session.get('mod'):
+                    return json_response(403, {'error': 'Forbidden'})
+                # Без userId обычный пользователь получает только свои данные, модератор - все
+                if not user_id and not session.get('mod'):
+                    user_id = str(session['uid'])
+            
             if path == 'listings':
-                return get_listings()
+                return get_listings(min_lsn)
             elif path == 'messages':
-                user_id = event.get('queryStringParameters', {}).get('userId')
-                return get_messages(int(user_id) if user_id else None)
+                return get_messages(int(user_id) if user_id else None, min_lsn)
             elif path == 'users':
-                return get_users()
+                return get_users(min_lsn)
             elif path == 'reports':
-                return get_reports()
+                return get_reports(min_lsn)
             elif path == 'reviews':
                 user_id = event.get('queryStringParameters', {}).get('userId')
-                return get_reviews(int(user_id) if user_id else None)
+                return get_reviews(int(user_id) if user_id else None, min_lsn)
             elif path == 'user-coins':
-                user_id = event.get('queryStringParameters', {}).get('userId')
                 return get_user_coins(int(user_id) if user_id else None)
             elif path == 'deposits':
-                user_id = event.get('queryStringParameters', {}).get('userId')
-                return get_deposits(int(user_id) if user_id else None)
+                return get_deposits(int(user_id) if user_id else None, min_lsn)
         
         elif method == 'POST':
             body = json.loads(event.get('body', '{}'))
             
+            if path in ACTOR_FIELDS:
+                if not session:
+                    return json_response(401, {'error': 'Unauthorized'})
+                actor_id = body.get(ACTOR_FIELDS[path])
+                if actor_id and str(actor_id) != str(session['uid']):
+                    return json_response(403, {'error': 'Forbidden'})
+            
             if path == 'register':
                 return register_user(body)
             elif path == 'login':
                 return login_user(body)
+            elif path == 'logout':
+                return logout_user(session)
             elif path == 'listing':
                 return create_listing(body)
             elif path == 'message':
@@ -73,41 +416,26 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return feature_listing(body)
         
         elif method == 'DELETE':
+            if not session:
+                return json_response(401, {'error': 'Unauthorized'})
+            
             if path == 'listing':
                 listing_id = event.get('queryStringParameters', {}).get('id')
-                return delete_listing(int(listing_id) if listing_id else None)
+                return delete_listing(int(listing_id) if listing_id else None, session)
             elif path == 'message':
                 message_id = event.get('queryStringParameters', {}).get('id')
-                return delete_message(int(message_id) if message_id else None)
+                return delete_message(int(message_id) if message_id else None, session)
         
-        return {
-            'statusCode': 404,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Not found'}),
-            'isBase64Encoded': False
-        }
+        return copy_response(NOT_FOUND_RESPONSE)
     
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)}),
-            'isBase64Encoded': False
-        }
-
-def get_listings() -> Dict[str, Any]:
-    conn = get_db_connection()
+        return json_response(500, {'error': str(e)})
+
+def get_listings(min_lsn: Optional[str] = None) -> Dict[str, Any]:
+    conn = get_read_connection(min_lsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    cur.execute('''
-        SELECT l.id, l.user_id, u.username, l.title, l.description, 
-               l.image_url, l.game_url, l.game_name, l.created_at,
-               l.is_featured, l.featured_until
-        FROM listings l
-        JOIN users u ON l.user_id = u.id
-        WHERE l.is_active = true
-        ORDER BY l.is_featured DESC, l.created_at DESC
-    ''')
+    cur.execute(LISTINGS_QUERY)
     
     listings = [dict(row) for row in cur.fetchall()]
     
@@ -122,24 +450,14 @@ def get_listings() -> Dict[str, Any]:
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(listings),
-        'isBase64Encoded': False
-    }
+    return json_response(200, listings)
 
 def register_user(data: Dict[str, Any]) -> Dict[str, Any]:
     username = data.get('username')
     password = data.get('password')
     
     if not username or not password:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Username and password required'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Username and password required'})
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -148,12 +466,7 @@ def register_user(data: Dict[str, Any]) -> Dict[str, Any]:
     if cur.fetchone():
         cur.close()
         conn.close()
-        return {
-            'statusCode': 409,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Username already exists'}),
-            'isBase64Encoded': False
-        }
+        return json_response(409, {'error': 'Username already exists'})
     
     avatar_url = f'https://api.dicebear.com/7.x/avataaars/svg?seed={username}'
     
@@ -165,17 +478,13 @@ def register_user(data: Dict[str, Any]) -> Dict[str, Any]:
     
     user = dict(cur.fetchone())
     user['created_at'] = user['created_at'].isoformat()
+    user.update(issue_session_token(user['id'], user['username'] == MODERATOR_USERNAME))
     
-    conn.commit()
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(user),
-        'isBase64Encoded': False
-    }
+    return json_response(200, user, wal_lsn)
 
 def login_user(data: Dict[str, Any]) -> Dict[str, Any]:
     username = data.get('username')
@@ -195,22 +504,19 @@ def login_user(data: Dict[str, Any]) -> Dict[str, Any]:
     conn.close()
     
     if not user:
-        return {
-            'statusCode': 401,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Invalid credentials'}),
-            'isBase64Encoded': False
-        }
+        return json_response(401, {'error': 'Invalid credentials'})
     
     user = dict(user)
     user['created_at'] = user['created_at'].isoformat()
+    user.update(issue_session_token(user['id'], user['username'] == MODERATOR_USERNAME))
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(user),
-        'isBase64Encoded': False
-    }
+    return json_response(200, user)
+
+def logout_user(session: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if session:
+        revoke_session_token(session)
+    
+    return copy_response(SUCCESS_RESPONSE)
 
 def create_listing(data: Dict[str, Any]) -> Dict[str, Any]:
     user_id = data.get('userId')
@@ -221,12 +527,7 @@ def create_listing(data: Dict[str, Any]) -> Dict[str, Any]:
     game_name = data.get('gameName')
     
     if not user_id or not title or not description:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Missing required fields'})
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -244,59 +545,44 @@ def create_listing(data: Dict[str, Any]) -> Dict[str, Any]:
     listing['username'] = username
     listing['created_at'] = listing['created_at'].isoformat()
     
-    conn.commit()
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(listing),
-        'isBase64Encoded': False
-    }
+    return json_response(200, listing, wal_lsn)
 
-def delete_listing(listing_id: Optional[int]) -> Dict[str, Any]:
+def delete_listing(listing_id: Optional[int], session: Dict[str, Any]) -> Dict[str, Any]:
     if not listing_id:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Listing ID required'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Listing ID required'})
     
     conn = get_db_connection()
     cur = conn.cursor()
     
-    cur.execute('UPDATE listings SET is_active = false WHERE id = %s', (listing_id,))
+    if session.get('mod'):
+        cur.execute('UPDATE listings SET is_active = false WHERE id = %s', (listing_id,))
+    else:
+        cur.execute('UPDATE listings SET is_active = false WHERE id = %s AND user_id = %s',
+                    (listing_id, session['uid']))
     
-    conn.commit()
+    if cur.rowcount == 0:
+        cur.close()
+        conn.close()
+        return json_response(404, {'error': 'Listing not found'})
+    
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps({'success': True}),
-        'isBase64Encoded': False
-    }
+    return json_response(200, {'success': True}, wal_lsn)
 
-def get_messages(user_id: Optional[int]) -> Dict[str, Any]:
-    conn = get_db_connection()
+def get_messages(user_id: Optional[int], min_lsn: Optional[str] = None) -> Dict[str, Any]:
+    conn = get_read_connection(min_lsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     if user_id:
-        cur.execute(f'''
-            SELECT m.id, m.from_user_id, m.to_user_id, m.content, m.reply_to_id, m.created_at
-            FROM messages m
-            WHERE m.from_user_id = {user_id} OR m.to_user_id = {user_id}
-            ORDER BY m.created_at ASC
-        ''')
+        cur.execute(USER_MESSAGES_QUERY, (user_id, user_id))
     else:
-        cur.execute('''
-            SELECT m.id, m.from_user_id, m.to_user_id, m.content, m.reply_to_id, m.created_at
-            FROM messages m
-            ORDER BY m.created_at ASC
-        ''')
+        cur.execute(MESSAGES_QUERY)
     
     messages = [dict(row) for row in cur.fetchall()]
     
@@ -307,12 +593,7 @@ def get_messages(user_id: Optional[int]) -> Dict[str, Any]:
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(messages),
-        'isBase64Encoded': False
-    }
+    return json_response(200, messages)
 
 def send_message(data: Dict[str, Any]) -> Dict[str, Any]:
     from_user_id = data.get('fromUserId')
@@ -321,76 +602,55 @@ def send_message(data: Dict[str, Any]) -> Dict[str, Any]:
     reply_to_id = data.get('replyToId')
     
     if not from_user_id or not to_user_id or not content:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Missing required fields'})
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    content_escaped = content.replace("'", "''")
-    now = datetime.now().isoformat()
-    reply_to_sql = f"{reply_to_id}" if reply_to_id else "NULL"
-    
-    cur.execute(f'''
+    cur.execute('''
         INSERT INTO messages (from_user_id, to_user_id, content, reply_to_id, created_at, is_read)
-        VALUES ({from_user_id}, {to_user_id}, '{content_escaped}', {reply_to_sql}, '{now}', false)
+        VALUES (%s, %s, %s, %s, %s, false)
         RETURNING id, from_user_id, to_user_id, content, reply_to_id, created_at
-    ''')
+    ''', (from_user_id, to_user_id, content, reply_to_id or None, datetime.now()))
     
     message = dict(cur.fetchone())
     message['created_at'] = message['created_at'].isoformat() if isinstance(message['created_at'], datetime) else message['created_at']
     
-    conn.commit()
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(message),
-        'isBase64Encoded': False
-    }
+    return json_response(200, message, wal_lsn)
 
-def delete_message(message_id: Optional[int]) -> Dict[str, Any]:
+def delete_message(message_id: Optional[int], session: Dict[str, Any]) -> Dict[str, Any]:
     if not message_id:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Message ID required'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Message ID required'})
     
     conn = get_db_connection()
     cur = conn.cursor()
     
-    cur.execute('DELETE FROM messages WHERE id = %s', (message_id,))
+    if session.get('mod'):
+        cur.execute('DELETE FROM messages WHERE id = %s', (message_id,))
+    else:
+        cur.execute('DELETE FROM messages WHERE id = %s AND from_user_id = %s', (message_id, session['uid']))
     
-    conn.commit()
+    if cur.rowcount == 0:
+        cur.close()
+        conn.close()
+        return json_response(404, {'error': 'Message not found'})
+    
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps({'success': True}),
-        'isBase64Encoded': False
-    }
+    return json_response(200, {'success': True}, wal_lsn)
 
 def create_deposit(data: Dict[str, Any]) -> Dict[str, Any]:
     user_id = data.get('userId')
     amount_rub = data.get('amountRub')
     
     if not user_id or not amount_rub:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Missing required fields'})
     
     coins_received = int(float(amount_rub) * 1.7)
     
@@ -414,28 +674,18 @@ def create_deposit(data: Dict[str, Any]) -> Dict[str, Any]:
     
     deposit['created_at'] = deposit['created_at'].isoformat()
     
-    conn.commit()
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(deposit),
-        'isBase64Encoded': False
-    }
+    return json_response(200, deposit, wal_lsn)
 
 def feature_listing(data: Dict[str, Any]) -> Dict[str, Any]:
     user_id = data.get('userId')
     listing_id = data.get('listingId')
     
     if not user_id or not listing_id:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Missing required fields'})
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -446,12 +696,7 @@ def feature_listing(data: Dict[str, Any]) -> Dict[str, Any]:
     if not user or user['coins'] < 10:
         cur.close()
         conn.close()
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Недостаточно монет'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Недостаточно монет'})
     
     featured_until = datetime.now() + timedelta(days=7)
     
@@ -465,12 +710,7 @@ def feature_listing(data: Dict[str, Any]) -> Dict[str, Any]:
     if not cur.fetchone():
         cur.close()
         conn.close()
-        return {
-            'statusCode': 404,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Listing not found'}),
-            'isBase64Encoded': False
-        }
+        return json_response(404, {'error': 'Listing not found'})
     
     cur.execute('UPDATE users SET coins = coins - 10 WHERE id = %s', (user_id,))
     
@@ -479,67 +719,38 @@ def feature_listing(data: Dict[str, Any]) -> Dict[str, Any]:
         VALUES (%s, -10, 'feature', 'Размещение на главной', %s)
     ''', (user_id, datetime.now()))
     
-    conn.commit()
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps({'success': True}),
-        'isBase64Encoded': False
-    }
+    return json_response(200, {'success': True}, wal_lsn)
 
 def get_user_coins(user_id: Optional[int]) -> Dict[str, Any]:
     if not user_id:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'User ID required'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'User ID required'})
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    cur.execute('SELECT coins FROM users WHERE id = %s', (user_id,))
+    cur.execute(USER_COINS_QUERY, (user_id,))
     user = cur.fetchone()
     
     cur.close()
     conn.close()
     
     if not user:
-        return {
-            'statusCode': 404,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'User not found'}),
-            'isBase64Encoded': False
-        }
+        return json_response(404, {'error': 'User not found'})
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps({'coins': user['coins']}),
-        'isBase64Encoded': False
-    }
+    return json_response(200, {'coins': user['coins']})
 
-def get_deposits(user_id: Optional[int]) -> Dict[str, Any]:
-    conn = get_db_connection()
+def get_deposits(user_id: Optional[int], min_lsn: Optional[str] = None) -> Dict[str, Any]:
+    conn = get_read_connection(min_lsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     if user_id:
-        cur.execute('''
-            SELECT id, user_id, amount_rub, coins_received, status, created_at
-            FROM deposits
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-        ''', (user_id,))
+        cur.execute(USER_DEPOSITS_QUERY, (user_id,))
     else:
-        cur.execute('''
-            SELECT id, user_id, amount_rub, coins_received, status, created_at
-            FROM deposits
-            ORDER BY created_at DESC
-        ''')
+        cur.execute(DEPOSITS_QUERY)
     
     deposits = [dict(row) for row in cur.fetchall()]
     
@@ -550,22 +761,13 @@ def get_deposits(user_id: Optional[int]) -> Dict[str, Any]:
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(deposits),
-        'isBase64Encoded': False
-    }
+    return json_response(200, deposits)
 
-def get_users() -> Dict[str, Any]:
-    conn = get_db_connection()
+def get_users(min_lsn: Optional[str] = None) -> Dict[str, Any]:
+    conn = get_read_connection(min_lsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    cur.execute('''
-        SELECT id, username, avatar_url, created_at, reports_count
-        FROM users
-        WHERE is_removed = false
-    ''')
+    cur.execute(USERS_QUERY)
     
     users = [dict(row) for row in cur.fetchall()]
     
@@ -576,12 +778,7 @@ def get_users() -> Dict[str, Any]:
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(users),
-        'isBase64Encoded': False
-    }
+    return json_response(200, users)
 
 def create_report(data: Dict[str, Any]) -> Dict[str, Any]:
     reporter_id = data.get('reporterId')
@@ -589,51 +786,31 @@ def create_report(data: Dict[str, Any]) -> Dict[str, Any]:
     reason = data.get('reason')
     
     if not reporter_id or not reported_user_id or not reason:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Missing required fields'})
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    reason_escaped = reason.replace("'", "''")
-    now = datetime.now().isoformat()
-    
-    cur.execute(f'''
+    cur.execute('''
         INSERT INTO reports (reporter_id, reported_user_id, reason, created_at)
-        VALUES ({reporter_id}, {reported_user_id}, '{reason_escaped}', '{now}')
+        VALUES (%s, %s, %s, %s)
         RETURNING id, reporter_id, reported_user_id, reason, created_at
-    ''')
+    ''', (reporter_id, reported_user_id, reason, datetime.now()))
     
     report = dict(cur.fetchone())
     report['created_at'] = report['created_at'].isoformat() if isinstance(report['created_at'], datetime) else report['created_at']
     
-    conn.commit()
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(report),
-        'isBase64Encoded': False
-    }
+    return json_response(200, report, wal_lsn)
 
-def get_reports() -> Dict[str, Any]:
-    conn = get_db_connection()
+def get_reports(min_lsn: Optional[str] = None) -> Dict[str, Any]:
+    conn = get_read_connection(min_lsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    cur.execute('''
-        SELECT r.id, r.reporter_id, r.reported_user_id, r.reason, r.created_at,
-               u1.username as reporter_username, u2.username as reported_username
-        FROM reports r
-        JOIN users u1 ON r.reporter_id = u1.id
-        JOIN users u2 ON r.reported_user_id = u2.id
-        ORDER BY r.created_at DESC
-    ''')
+    cur.execute(REPORTS_QUERY)
     
     reports = [dict(row) for row in cur.fetchall()]
     
@@ -644,12 +821,7 @@ def get_reports() -> Dict[str, Any]:
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(reports),
-        'isBase64Encoded': False
-    }
+    return json_response(200, reports)
 
 def create_review(data: Dict[str, Any]) -> Dict[str, Any]:
     from_user_id = data.get('fromUserId')
@@ -658,12 +830,7 @@ def create_review(data: Dict[str, Any]) -> Dict[str, Any]:
     comment = data.get('comment')
     
     if not from_user_id or not to_user_id or rating is None:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
+        return json_response(400, {'error': 'Missing required fields'})
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -677,38 +844,20 @@ def create_review(data: Dict[str, Any]) -> Dict[str, Any]:
     review = dict(cur.fetchone())
     review['created_at'] = review['created_at'].isoformat()
     
-    conn.commit()
+    wal_lsn = commit_write(conn)
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(review),
-        'isBase64Encoded': False
-    }
+    return json_response(200, review, wal_lsn)
 
-def get_reviews(user_id: Optional[int]) -> Dict[str, Any]:
-    conn = get_db_connection()
+def get_reviews(user_id: Optional[int], min_lsn: Optional[str] = None) -> Dict[str, Any]:
+    conn = get_read_connection(min_lsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     if user_id:
-        cur.execute('''
-            SELECT r.id, r.from_user_id, r.to_user_id, r.rating, r.comment, r.created_at,
-                   u.username as from_username
-            FROM reviews r
-            JOIN users u ON r.from_user_id = u.id
-            WHERE r.to_user_id = %s
-            ORDER BY r.created_at DESC
-        ''', (user_id,))
+        cur.execute(USER_REVIEWS_QUERY, (user_id,))
     else:
-        cur.execute('''
-            SELECT r.id, r.from_user_id, r.to_user_id, r.rating, r.comment, r.created_at,
-                   u.username as from_username
-            FROM reviews r
-            JOIN users u ON r.from_user_id = u.id
-            ORDER BY r.created_at DESC
-        ''')
+        cur.execute(REVIEWS_QUERY)
     
     reviews = [dict(row) for row in cur.fetchall()]
     
@@ -719,9 +868,6 @@ def get_reviews(user_id: Optional[int]) -> Dict[str, Any]:
     cur.close()
     conn.close()
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'body': json.dumps(reviews),
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+    return json_response(200, reviews)
+
+startup_profile['import_ms'] = round((time.perf_counter() - _import_started) * 1000, 2)
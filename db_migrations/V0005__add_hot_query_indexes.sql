@@ -0,0 +1,33 @@
+-- Индексы для часто опрашиваемых запросов API
+
+-- Колонки, которые уже читает API, но которых нет в предыдущих миграциях
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS game_url TEXT;
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS game_name VARCHAR(255);
+
+-- Лента объявлений: WHERE is_active ORDER BY is_featured DESC, created_at DESC
+CREATE INDEX IF NOT EXISTS idx_listings_active_feed ON listings(is_featured DESC, created_at DESC) WHERE is_active = true;
+
+-- Сообщения: общий список и переписка пользователя по времени
+CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_from_user_created ON messages(from_user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_to_user_created ON messages(to_user_id, created_at);
+-- Составные индексы выше покрывают одноколоночные из V0001
+DROP INDEX IF EXISTS idx_messages_from_user;
+DROP INDEX IF EXISTS idx_messages_to_user;
+
+-- Отзывы: JOIN по автору и выборка по получателю с сортировкой
+CREATE INDEX IF NOT EXISTS idx_reviews_from_user ON reviews(from_user_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_created_at ON reviews(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_reviews_to_user_created ON reviews(to_user_id, created_at DESC);
+DROP INDEX IF EXISTS idx_reviews_to_user;
+
+-- Жалобы
+CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports(created_at DESC);
+
+-- Пополнения по пользователю
+CREATE INDEX IF NOT EXISTS idx_deposits_created_at ON deposits(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_deposits_user_created ON deposits(user_id, created_at DESC);
+
+-- API пока не читает coin_transactions, поэтому в HOT_QUERIES этого запроса нет: индекс
+-- нужен для проверки внешнего ключа user_id -> users(id) и будущей истории операций
+CREATE INDEX IF NOT EXISTS idx_coin_transactions_user_created ON coin_transactions(user_id, created_at DESC);
@@ -1,4 +1,14 @@
 const API_URL = 'https://functions.poehali.dev/f67b84c3-8b97-41e9-83e4-e11c5e0f7999';
+const TOKEN_KEY = 'rotrade_token';
+const TOKEN_EXPIRES_KEY = 'rotrade_token_expires';
+export const SESSION_EXPIRED_EVENT = 'rotrade:session-expired';
+
+// LSN последней записи: чтения ждут реплику, которая его уже применила
+let lastWalLsn: string | null = null;
+
+function readUrl(url: string): string {
+  return lastWalLsn ? `${url}&minLsn=${encodeURIComponent(lastWalLsn)}` : url;
+}
 
 export interface User {
   id: number;
@@ -6,6 +16,8 @@ export interface User {
   avatar_url?: string;
   created_at?: string;
   coins?: number;
+  token?: string;
+  expires_at?: string;
 }
 
 export interface Listing {
@@ -60,7 +72,48 @@ export interface Deposit {
   created_at: string;
 }
 
+export function getSessionToken(): string | null {
+  return localStorage.getItem(TOKEN_KEY);
+}
+
+export function hasValidSession(): boolean {
+  const expiresAt = localStorage.getItem(TOKEN_EXPIRES_KEY);
+  return !!getSessionToken() && !!expiresAt && new Date(expiresAt).getTime() > Date.now();
+}
+
+export function clearSession() {
+  localStorage.removeItem(TOKEN_KEY);
+  localStorage.removeItem(TOKEN_EXPIRES_KEY);
+  localStorage.removeItem('rotrade_user');
+}
+
+function storeSession(user: User) {
+  if (user.token && user.expires_at) {
+    localStorage.setItem(TOKEN_KEY, user.token);
+    localStorage.setItem(TOKEN_EXPIRES_KEY, user.expires_at);
+  }
+}
+
+function authHeaders(): Record<string, string> {
+  const token = getSessionToken();
+  return token ? { 'X-Auth-Token': token } : {};
+}
+
+function jsonHeaders(): Record<string, string> {
+  return { 'Content-Type': 'application/json', ...authHeaders() };
+}
+
 async function handleResponse(response: Response) {
+  if (response.status === 401 && getSessionToken()) {
+    clearSession();
+    window.dispatchEvent(new Event(SESSION_EXPIRED_EVENT));
+  }
+
+  const walLsn = response.headers.get('X-Wal-Lsn');
+  if (walLsn) {
+    lastWalLsn = walLsn;
+  }
+
   if (response.status === 402) {
     throw new Error('Сервис временно недоступен. Обратитесь к администратору.');
   }
@@ -81,7 +134,9 @@ export const api = {
       body: JSON.stringify({ username, password })
     });
     
-    return handleResponse(response);
+    const user: User = await handleResponse(response);
+    storeSession(user);
+    return user;
   },
 
   async loginUser(username: string, password: string): Promise<User> {
@@ -91,12 +146,24 @@ export const api = {
       body: JSON.stringify({ username, password })
     });
     
-    return handleResponse(response);
+    const user: User = await handleResponse(response);
+    storeSession(user);
+    return user;
+  },
+
+  async logoutUser(): Promise<void> {
+    const headers = jsonHeaders();
+    clearSession();
+    await fetch(`${API_URL}?action=logout`, {
+      method: 'POST',
+      headers,
+      body: '{}'
+    }).catch(() => {});
   },
 
   async getListings(): Promise<Listing[]> {
     try {
-      const response = await fetch(`${API_URL}?action=listings`);
+      const response = await fetch(readUrl(`${API_URL}?action=listings`));
       return handleResponse(response);
     } catch (error) {
       console.error('Get listings error:', error);
@@ -114,7 +181,7 @@ export const api = {
   }): Promise<Listing> {
     const response = await fetch(`${API_URL}?action=listing`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(),
       body: JSON.stringify(data)
     });
     
@@ -123,7 +190,8 @@ export const api = {
 
   async deleteListing(id: number): Promise<void> {
     const response = await fetch(`${API_URL}?action=listing&id=${id}`, {
-      method: 'DELETE'
+      method: 'DELETE',
+      headers: jsonHeaders()
     });
     
     await handleResponse(response);
@@ -131,7 +199,7 @@ export const api = {
 
   async getMessages(userId?: number): Promise<Message[]> {
     const url = userId ? `${API_URL}?action=messages&userId=${userId}` : `${API_URL}?action=messages`;
-    const response = await fetch(url);
+    const response = await fetch(readUrl(url), { headers: authHeaders() });
     return handleResponse(response);
   },
 
@@ -143,7 +211,7 @@ export const api = {
   }): Promise<Message> {
     const response = await fetch(`${API_URL}?action=message`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(),
       body: JSON.stringify(data)
     });
     
@@ -152,14 +220,15 @@ export const api = {
 
   async deleteMessage(id: number): Promise<void> {
     const response = await fetch(`${API_URL}?action=message&id=${id}`, {
-      method: 'DELETE'
+      method: 'DELETE',
+      headers: jsonHeaders()
     });
     
     await handleResponse(response);
   },
 
   async getUsers(): Promise<User[]> {
-    const response = await fetch(`${API_URL}?action=users`);
+    const response = await fetch(readUrl(`${API_URL}?action=users`));
     return handleResponse(response);
   },
 
@@ -170,7 +239,7 @@ export const api = {
   }): Promise<Report> {
     const response = await fetch(`${API_URL}?action=report`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(),
       body: JSON.stringify(data)
     });
     
@@ -178,7 +247,7 @@ export const api = {
   },
 
   async getReports(): Promise<Report[]> {
-    const response = await fetch(`${API_URL}?action=reports`);
+    const response = await fetch(readUrl(`${API_URL}?action=reports`));
     return handleResponse(response);
   },
 
@@ -190,7 +259,7 @@ export const api = {
   }): Promise<Review> {
     const response = await fetch(`${API_URL}?action=review`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(),
       body: JSON.stringify(data)
     });
     
@@ -199,12 +268,12 @@ export const api = {
 
   async getReviews(userId?: number): Promise<Review[]> {
     const url = userId ? `${API_URL}?action=reviews&userId=${userId}` : `${API_URL}?action=reviews`;
-    const response = await fetch(url);
+    const response = await fetch(readUrl(url));
     return handleResponse(response);
   },
 
   async getUserCoins(userId: number): Promise<{ coins: number }> {
-    const response = await fetch(`${API_URL}?action=user-coins&userId=${userId}`);
+    const response = await fetch(`${API_URL}?action=user-coins&userId=${userId}`, { headers: authHeaders() });
     return handleResponse(response);
   },
 
@@ -214,7 +283,7 @@ export const api = {
   }): Promise<Deposit> {
     const response = await fetch(`${API_URL}?action=deposit`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(),
       body: JSON.stringify(data)
     });
     
@@ -227,7 +296,7 @@ export const api = {
   }): Promise<{ success: boolean }> {
     const response = await fetch(`${API_URL}?action=feature-listing`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(),
       body: JSON.stringify(data)
     });
     
@@ -236,7 +305,7 @@ export const api = {
 
   async getDeposits(userId?: number): Promise<Deposit[]> {
     const url = userId ? `${API_URL}?action=deposits&userId=${userId}` : `${API_URL}?action=deposits`;
-    const response = await fetch(url);
+    const response = await fetch(readUrl(url), { headers: authHeaders() });
     return handleResponse(response);
   }
 };
\ No newline at end of file
@@ -9,7 +9,7 @@ import { Badge } from '@/components/ui/badge';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import { toast } from 'sonner';
 import Icon from '@/components/ui/icon';
-import { api } from '@/lib/api';
+import { api, clearSession, hasValidSession, SESSION_EXPIRED_EVENT } from '@/lib/api';
 import { useTheme } from '@/contexts/ThemeContext';
 import { playNotificationSound } from '@/lib/sound';
 
@@ -116,7 +116,9 @@ const Index = () => {
 
   useEffect(() => {
     const user = localStorage.getItem('rotrade_user');
-    if (user) {
+    if (user && !hasValidSession()) {
+      clearSession();
+    } else if (user) {
       const parsedUser = JSON.parse(user);
       setCurrentUser(parsedUser);
       setShowAuth(false);
@@ -888,12 +890,25 @@ const Index = () => {
   };
 
   const logout = () => {
+    api.logoutUser();
     localStorage.removeItem('rotrade_user');
     setCurrentUser(null);
     setShowAuth(true);
     setActiveTab('home');
   };
 
+  useEffect(() => {
+    const handleSessionExpired = () => {
+      setCurrentUser(null);
+      setShowAuth(true);
+      setActiveTab('home');
+      toast.error('Сессия истекла, войдите снова');
+    };
+
+    window.addEventListener(SESSION_EXPIRED_EVENT, handleSessionExpired);
+    return () => window.removeEventListener(SESSION_EXPIRED_EVENT, handleSessionExpired);
+  }, []);
+
   if (showAuth) {
     return (
       <div className="min-h-screen flex items-center justify-center p-4">
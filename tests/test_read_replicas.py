@@ -0,0 +1,184 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault('DATABASE_URL', 'postgresql://test@localhost/test')
+os.environ.setdefault('SESSION_SECRET', 'test-secret')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend' / 'api'))
+
+import psycopg2  # noqa: E402
+
+import index  # noqa: E402
+
+PRIMARY = os.environ['DATABASE_URL']
+R1 = 'postgresql://replica1/test'
+R2 = 'postgresql://replica2/test'
+DEAD = 'postgresql://dead/test'
+
+
+class FakeCursor:
+    def __init__(self, row):
+        self.row = row
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.closed = 0
+        self.committed = False
+
+    def cursor(self, **kwargs):
+        return FakeCursor(('0/3D0055A8',))
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ReadReplicaTest(unittest.TestCase):
+    def setUp(self):
+        self.connections = []
+        self.clock = FakeClock()
+        index._replica_offset = 0
+        index._replica_down_until.clear()
+        patches = [
+            mock.patch.object(index.psycopg2, 'connect', side_effect=self.connect),
+            mock.patch.object(index.time, 'monotonic', side_effect=self.clock.monotonic),
+            mock.patch.object(index.time, 'sleep', side_effect=self.clock.sleep),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def connect(self, dsn, **kwargs):
+        if dsn == DEAD:
+            raise psycopg2.OperationalError('timeout expired')
+        conn = FakeConnection(dsn)
+        self.connections.append(conn)
+        return conn
+
+    def use_replicas(self, *dsns):
+        patch = mock.patch.object(index, 'READ_URLS', list(dsns))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def lag(self, lags):
+        # lags: dsn -> список значений отставания на каждый вызов (последнее повторяется)
+        calls = []
+
+        def replica_lag_bytes(conn, min_lsn):
+            calls.append(conn.dsn)
+            values = lags[conn.dsn]
+            return values.pop(0) if len(values) > 1 else values[0]
+
+        patch = mock.patch.object(index, 'replica_lag_bytes', side_effect=replica_lag_bytes)
+        patch.start()
+        self.addCleanup(patch.stop)
+        return calls
+
+    def connected_to(self):
+        return [conn.dsn for conn in self.connections]
+
+    def test_without_replicas_reads_go_to_primary(self):
+        self.use_replicas()
+        self.assertEqual(index.get_read_connection('0/1').dsn, PRIMARY)
+
+    def test_round_robin_without_min_lsn(self):
+        self.use_replicas(R1, R2)
+        dsns = [index.get_read_connection().dsn for _ in range(3)]
+        self.assertEqual(dsns, [R1, R2, R1])
+
+    def test_dead_replica_is_skipped_and_remembered(self):
+        self.use_replicas(DEAD, R1)
+        self.assertEqual(index.get_read_connection().dsn, R1)
+        self.assertIn(DEAD, index._replica_down_until)
+        
+        with mock.patch.object(index.psycopg2, 'connect', side_effect=self.connect) as connect:
+            for _ in range(4):
+                self.assertEqual(index.get_read_connection().dsn, R1)
+            self.assertNotIn(DEAD, [call.args[0] for call in connect.call_args_list])
+        
+        self.clock.now += index.REPLICA_RETRY_SECONDS + 1
+        with mock.patch.object(index.psycopg2, 'connect', side_effect=self.connect) as connect:
+            index.get_read_connection()
+            index.get_read_connection()
+            self.assertIn(DEAD, [call.args[0] for call in connect.call_args_list])
+
+    def test_failed_lag_check_marks_replica_down(self):
+        self.use_replicas(R1, R2)
+        calls = []
+
+        def replica_lag_bytes(conn, min_lsn):
+            calls.append(conn.dsn)
+            if conn.dsn == R1:
+                raise psycopg2.OperationalError('server closed the connection')
+            return 0
+
+        with mock.patch.object(index, 'replica_lag_bytes', side_effect=replica_lag_bytes):
+            self.assertEqual(index.get_read_connection('0/1').dsn, R2)
+        self.assertIn(R1, index._replica_down_until)
+
+    def test_caught_up_replica_is_chosen_over_lagging_one(self):
+        self.use_replicas(R1, R2)
+        self.lag({R1: [4096], R2: [0]})
+        conn = index.get_read_connection('0/1')
+        self.assertEqual(conn.dsn, R2)
+        self.assertTrue(self.connections[0].closed)
+        self.assertEqual(self.clock.now, 1000.0)
+
+    def test_waits_on_least_lagged_replica_only(self):
+        self.use_replicas(R1, R2)
+        calls = self.lag({R1: [4096], R2: [128, 128, 0]})
+        conn = index.get_read_connection('0/1')
+        self.assertEqual(conn.dsn, R2)
+        self.assertEqual(calls, [R1, R2, R2, R2])
+        self.assertTrue(self.connections[0].closed)
+
+    def test_falls_back_to_primary_when_no_replica_catches_up(self):
+        self.use_replicas(R1, R2)
+        calls = self.lag({R1: [4096], R2: [128]})
+        conn = index.get_read_connection('0/1')
+        self.assertEqual(conn.dsn, PRIMARY)
+        self.assertEqual(calls[:2], [R1, R2])
+        self.assertEqual(set(calls[2:]), {R2})
+        self.assertTrue(all(c.closed for c in self.connections if c.dsn != PRIMARY))
+        self.assertGreaterEqual(self.clock.now - 1000.0, index.REPLICA_WAIT_SECONDS)
+
+    def test_commit_write_returns_lsn_only_with_replicas(self):
+        self.use_replicas()
+        conn = FakeConnection(PRIMARY)
+        self.assertIsNone(index.commit_write(conn))
+        self.assertTrue(conn.committed)
+        
+        with mock.patch.object(index, 'READ_URLS', [R1]):
+            conn = FakeConnection(PRIMARY)
+            self.assertEqual(index.commit_write(conn), '0/3D0055A8')
+            self.assertTrue(conn.committed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import hashlib
+import hmac
+import json
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault('DATABASE_URL', 'postgresql://test@localhost/test')
+os.environ.setdefault('SESSION_SECRET', 'test-secret')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend' / 'api'))
+
+import index  # noqa: E402
+
+
+def sign(payload) -> str:
+    encoded = index._b64encode(json.dumps(payload).encode())
+    signature = hmac.new(index.get_session_secret(), encoded.encode(), hashlib.sha256).digest()
+    return f'{encoded}.{index._b64encode(signature)}'
+
+
+def call(method, query, token=None, body=None):
+    event = {
+        'httpMethod': method,
+        'queryStringParameters': query,
+        'headers': {'X-Auth-Token': token} if token else {},
+        'body': json.dumps(body or {}),
+    }
+    return index.route(event)['statusCode']
+
+
+class SessionTokenTest(unittest.TestCase):
+    def setUp(self):
+        index._revoked_tokens.clear()
+
+    def test_round_trip(self):
+        token = index.issue_session_token(5)['token']
+        session = index.verify_session_token(token)
+        self.assertEqual(session['uid'], 5)
+        self.assertFalse(session['mod'])
+
+    def test_moderator_flag(self):
+        token = index.issue_session_token(1, True)['token']
+        self.assertTrue(index.verify_session_token(token)['mod'])
+
+    def test_tampered_signature(self):
+        token = index.issue_session_token(5)['token']
+        encoded, signature = token.split('.')
+        forged = sign({'uid': 6, 'exp': 2 ** 40, 'jti': 'x'}).split('.')[0]
+        self.assertIsNone(index.verify_session_token(f'{forged}.{signature}'))
+        self.assertIsNone(index.verify_session_token(f'{encoded}.{signature[:-2]}AA'))
+
+    def test_malformed_tokens(self):
+        for token in (None, '', 'abc', 'a.b.c', 'abc.@@@', 'é.é'):
+            self.assertIsNone(index.verify_session_token(token))
+        self.assertIsNone(index.verify_session_token(sign([1, 2, 3])))
+        encoded = index._b64encode(b'not json')
+        signature = hmac.new(index.get_session_secret(), encoded.encode(), hashlib.sha256).digest()
+        self.assertIsNone(index.verify_session_token(f'{encoded}.{index._b64encode(signature)}'))
+
+    def test_expired(self):
+        token = index.issue_session_token(5)['token']
+        expired_at = index.verify_session_token(token)['exp'] + 1
+        with mock.patch.object(index.time, 'time', return_value=expired_at):
+            self.assertIsNone(index.verify_session_token(token))
+
+    def test_revoked(self):
+        token = index.issue_session_token(5)['token']
+        index.revoke_session_token(index.verify_session_token(token))
+        self.assertIsNone(index.verify_session_token(token))
+        self.assertIsNotNone(index.verify_session_token(index.issue_session_token(5)['token']))
+
+    def test_revocation_list_drops_expired_entries(self):
+        index._revoked_tokens['old'] = 0
+        index.revoke_session_token(index.verify_session_token(index.issue_session_token(5)['token']))
+        self.assertNotIn('old', index._revoked_tokens)
+
+
+class RouteAuthorizationTest(unittest.TestCase):
+    def setUp(self):
+        self.token = index.issue_session_token(5)['token']
+
+    def test_writes_need_session(self):
+        self.assertEqual(call('POST', {'action': 'listing'}, body={'userId': 5}), 401)
+        self.assertEqual(call('POST', {'action': 'message'}, 'bad.token', {'fromUserId': 5}), 401)
+
+    def test_writes_for_other_user_forbidden(self):
+        self.assertEqual(call('POST', {'action': 'listing'}, self.token, {'userId': 6}), 403)
+        self.assertEqual(call('POST', {'action': 'review'}, self.token, {'fromUserId': 6}), 403)
+
+    def test_deletes_need_session(self):
+        self.assertEqual(call('DELETE', {'action': 'listing', 'id': '3'}), 401)
+        self.assertEqual(call('DELETE', {'action': 'message', 'id': '3'}), 401)
+
+    def test_private_reads(self):
+        self.assertEqual(call('GET', {'action': 'messages'}), 401)
+        self.assertEqual(call('GET', {'action': 'deposits', 'userId': '6'}, self.token), 403)
+        self.assertEqual(call('GET', {'action': 'user-coins', 'userId': '6'}, self.token), 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
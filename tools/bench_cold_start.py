@@ -0,0 +1,95 @@
+'''
+Business: Бенчмарк холодного старта функции backend/api - импорт модуля и первый запрос в новом процессе
+Args: --runs число запусков, --method/--action/--param/--header запрос, --user-id сессия,
+      --max-p99-ms порог для регрессии
+Returns: код выхода 1, если p99 холодного старта выше порога
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+API_DIR = ROOT / 'backend' / 'api'
+
+# Выполняется в отдельном процессе, чтобы каждый запуск был настоящим холодным стартом
+CHILD_SCRIPT = '''
+import io, json, sys, time, contextlib
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import index
+    imported = time.perf_counter()
+    response = index.handler(json.loads(sys.argv[1]), None)
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (finished - imported) * 1000,
+    'total_ms': (finished - started) * 1000,
+    'status': response['statusCode'],
+}))
+'''
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+# Токен выпускается в этом процессе, а не в замеряемом, чтобы не влиять на холодный старт
+def issue_token(user_id: int) -> str:
+    sys.path.insert(0, str(API_DIR))
+    from index import issue_session_token
+    return issue_session_token(user_id)['token']
+
+def run_once(event: Dict) -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT, json.dumps(event)],
+        cwd=API_DIR, env=os.environ.copy(), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Бенчмарк холодного старта API')
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--action', default='listings')
+    parser.add_argument('--param', action='append', default=[], metavar='KEY=VALUE',
+                        help='дополнительный query-параметр, например userId=2')
+    parser.add_argument('--header', action='append', default=[], metavar='KEY=VALUE',
+                        help='заголовок запроса, например X-Auth-Token=...')
+    parser.add_argument('--user-id', type=int, default=None,
+                        help='выпустить X-Auth-Token для этого пользователя (нужен тот же SESSION_SECRET)')
+    parser.add_argument('--max-p99-ms', type=float, default=None,
+                        help='завершиться с ошибкой, если p99 total выше порога')
+    args = parser.parse_args()
+    
+    query = dict(param.split('=', 1) for param in args.param)
+    query['action'] = args.action
+    headers = dict(header.split('=', 1) for header in args.header)
+    if args.user_id is not None:
+        headers['X-Auth-Token'] = issue_token(args.user_id)
+    event = {'httpMethod': args.method, 'queryStringParameters': query, 'headers': headers}
+    if args.method == 'POST':
+        event['body'] = '{}'
+    
+    samples = [run_once(event) for _ in range(args.runs)]
+    if any(sample['status'] in (401, 403) for sample in samples):
+        print('WARNING: запрос отклонён авторизацией, замер не доходит до БД (нужен --user-id)')
+    
+    print(f'{args.method} {args.action}, {args.runs} cold starts')
+    for key in ('import_ms', 'first_request_ms', 'total_ms'):
+        values = [sample[key] for sample in samples]
+        print(f'{key:>17}: p50 {percentile(values, 50):7.2f}  p99 {percentile(values, 99):7.2f}')
+    
+    p99 = percentile([sample['total_ms'] for sample in samples], 99)
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        print(f'FAIL: p99 {p99:.2f} ms > {args.max_p99_ms} ms')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+'''
+Business: Проверка планов горячих запросов API на регрессии (seq scan / явная сортировка)
+Args: --dsn локальной БД, --threshold порог строк, --no-seed чтобы не пересоздавать данные
+Returns: код выхода 1, если хотя бы один запрос получил плохой план
+'''
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+import psycopg2
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend' / 'api'))
+
+from index import HOT_QUERIES  # noqa: E402
+
+SCHEMA = 'plan_check'
+SAMPLE_USER_ID = 42
+
+# Допустимые seq scan: список пользователей отдаётся целиком, а для жалоб (их единицы)
+# хеш по users дешевле, чем поиск по индексу на каждую строку
+ALLOWED_SEQ_SCANS = {
+    'users': {'users'},
+    'reports': {'users'},
+}
+
+# Объёмы примерно повторяют боевые пропорции: сообщений больше всего, жалоб - единицы
+SEED_SQL = '''
+    INSERT INTO users (username, password_hash, avatar_url, created_at, reports_count, is_removed, coins)
+    SELECT 'user' || g, 'x', NULL, NOW() - g * INTERVAL '1 minute', 0, g %% 50 = 0, 100
+    FROM generate_series(1, %(users)s) g;
+
+    INSERT INTO listings (user_id, title, description, created_at, is_active, is_featured)
+    SELECT 1 + g %% %(users)s, 'title ' || g, 'description', NOW() - g * INTERVAL '1 second',
+           g %% 4 <> 0, g %% 100 = 0
+    FROM generate_series(1, %(rows)s) g;
+
+    INSERT INTO messages (from_user_id, to_user_id, content, is_read, created_at)
+    SELECT 1 + g %% %(users)s, 1 + (g * 7) %% %(users)s, 'hello', false, NOW() - g * INTERVAL '1 second'
+    FROM generate_series(1, %(rows)s * 5) g;
+
+    INSERT INTO reviews (from_user_id, to_user_id, rating, comment, created_at)
+    SELECT 1 + g %% %(users)s, 1 + (g * 3) %% %(users)s, 1 + g %% 5, 'ok', NOW() - g * INTERVAL '1 second'
+    FROM generate_series(1, %(rows)s) g;
+
+    INSERT INTO reports (reporter_id, reported_user_id, reason, created_at)
+    SELECT 1 + g %% %(users)s, 1 + (g * 11) %% %(users)s, 'spam', NOW() - g * INTERVAL '1 second'
+    FROM generate_series(1, %(rows)s / 100) g;
+
+    INSERT INTO deposits (user_id, amount_rub, coins_received, status, created_at)
+    SELECT 1 + g %% %(users)s, 100, 170, 'completed', NOW() - g * INTERVAL '1 second'
+    FROM generate_series(1, %(rows)s) g;
+
+    INSERT INTO coin_transactions (user_id, amount, type, description, created_at)
+    SELECT 1 + g %% %(users)s, 170, 'deposit', 'seed', NOW() - g * INTERVAL '1 second'
+    FROM generate_series(1, %(rows)s) g;
+'''
+
+def seed_database(conn, users: int, rows: int) -> None:
+    cur = conn.cursor()
+    cur.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    cur.execute(f'CREATE SCHEMA {SCHEMA}')
+    cur.execute(f'SET search_path TO {SCHEMA}')
+    
+    for migration in sorted((ROOT / 'db_migrations').glob('V*.sql')):
+        cur.execute(migration.read_text(encoding='utf-8'))
+    
+    cur.execute(SEED_SQL, {'users': users, 'rows': rows})
+    conn.commit()
+    
+    conn.autocommit = True
+    cur.execute('ANALYZE')
+    conn.autocommit = False
+    cur.close()
+
+def find_problems(node: Dict[str, Any], threshold: int, allowed: Set[str]) -> List[str]:
+    problems = []
+    node_type = node['Node Type']
+    rows = node.get('Plan Rows', 0)
+    
+    if node_type == 'Seq Scan' and rows > threshold and node.get('Relation Name') not in allowed:
+        problems.append(f"Seq Scan on {node.get('Relation Name')} (~{rows} rows)")
+    elif node_type in ('Sort', 'Incremental Sort') and rows > threshold:
+        problems.append(f"{node_type} by {', '.join(node.get('Sort Key', []))} (~{rows} rows)")
+    
+    for child in node.get('Plans', []):
+        problems.extend(find_problems(child, threshold, allowed))
+    return problems
+
+def explain(cur, sql: str) -> Dict[str, Any]:
+    params = (SAMPLE_USER_ID,) * sql.count('%s')
+    cur.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Проверка планов горячих запросов API')
+    parser.add_argument('--dsn', default=os.environ.get('PLAN_CHECK_DATABASE_URL'),
+                        help='локальная БД для проверки (или PLAN_CHECK_DATABASE_URL)')
+    parser.add_argument('--threshold', type=int, default=1000,
+                        help='максимум строк для seq scan / sort')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--no-seed', action='store_true',
+                        help=f'использовать уже заполненную схему {SCHEMA}')
+    args = parser.parse_args()
+    
+    if not args.dsn:
+        parser.error('укажите --dsn или PLAN_CHECK_DATABASE_URL')
+    
+    conn = psycopg2.connect(args.dsn)
+    conn.set_client_encoding('UTF8')
+    if not args.no_seed:
+        seed_database(conn, args.users, args.rows)
+    
+    cur = conn.cursor()
+    cur.execute(f'SET search_path TO {SCHEMA}')
+    
+    failed = False
+    for name, sql in HOT_QUERIES.items():
+        problems = find_problems(explain(cur, sql), args.threshold, ALLOWED_SEQ_SCANS.get(name, set()))
+        
+        if problems:
+            failed = True
+            print(f'FAIL {name}')
+            for problem in problems:
+                print(f'     {problem}')
+        else:
+            print(f'ok   {name}')
+    
+    cur.close()
+    conn.close()
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())